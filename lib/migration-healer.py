@@ -8,13 +8,102 @@ Can perform automated remediation when --fix flag is provided.
 import sys
 import re
 import json
+import shlex
 import subprocess
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, TextIO, Union
 from dataclasses import dataclass
-from collections import defaultdict
-
-
-@dataclass
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib json module is used otherwise
+    orjson = None
+
+
+# Patterns are compiled once at import time instead of on every parse, with
+# re.ASCII since MySQL/Laravel error text is plain ASCII.
+# A single alternation covers both error formats so the output is scanned once:
+#   1. Primary: Table 'db.table' with ANY amount of whitespace (including
+#      newlines) before doesn't exist
+#   2. SQLSTATE fallback: unquoted or half-quoted db.table names
+_PRIMARY = r"Table\s+'([^']+)\.([^']+?)'\s+doesn't\s+exist"
+_FALLBACK_FORM = r"Table\s+'?([^'\s\.]+)\.([^'\s]+)'?\s+doesn't\s+exist"
+_MISSING_TABLE = re.compile(
+    f"(?:{_PRIMARY})|(?:{_FALLBACK_FORM})",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL | re.ASCII
+)
+# The fallback format on its own, to tell whether a primary match would also
+# have been read as a SQLSTATE error
+_FALLBACK = re.compile(_FALLBACK_FORM, re.IGNORECASE | re.DOTALL | re.ASCII)
+# The fallback format is only trusted after a SQLSTATE[42S02] marker
+_SQLSTATE = re.compile(r'SQLSTATE\[42S02\]', re.IGNORECASE | re.ASCII)
+# Literal prefilter for the missing-table pattern, searched case-insensitively
+# without lowercasing a copy of the output
+_DOESNT = re.compile(r"doesn't", re.IGNORECASE | re.ASCII)
+# ANSI CSI sequences: parameter bytes, then any final byte in @-~ (colors,
+# cursor movement, erase codes); an incomplete sequence is left untouched
+_ANSI = re.compile(r'\x1b\[[0-9;]*[@-~]')
+
+# Streaming parse: input is read in chunks and only a short tail is carried
+# over, long enough to hold an error message split across two chunks
+_CHUNK_SIZE = 64 * 1024
+_CARRY = 500
+# Characters around a match inspected to guess the failing operation
+_CONTEXT_BEFORE = 200
+_CONTEXT_AFTER = 100
+# Longest raw_error kept for SQLSTATE-format errors
+_RAW_ERROR_LEN = 150
+
+# Slotted dataclasses need Python 3.10+; older interpreters (e.g. the macOS
+# system python3) fall back to regular instances
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# docker exec calls run at once by run_docker_checks, and the seconds each
+# may take before it is given up on
+_CHECK_WORKERS = 8
+_CHECK_TIMEOUT = 30
+
+# Report rules
+_SEP_EQ = "=" * 70
+_SEP_DASH = "-" * 70
+_WARN_BAR = "⚠️ " * 35
+
+
+def _strip_ansi(text: str) -> str:
+    """
+    Remove ANSI CSI escape sequences (colors, cursor movement) from text.
+
+    Output redirected to a file usually has no escapes at all, so that case
+    returns the input untouched without copying it.
+    """
+    if '\x1b' not in text:
+        return text
+
+    return _ANSI.sub('', text)
+
+
+def _read_chunks(stream: TextIO, size: int = _CHUNK_SIZE) -> Iterator[str]:
+    """Yield a text stream in fixed-size chunks."""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _dump_json(payload: Dict, compact: bool = False) -> str:
+    """Serialize the JSON report, preferring orjson when it is installed."""
+    if orjson is not None:
+        option = 0 if compact else orjson.OPT_INDENT_2
+        return orjson.dumps(payload, option=option).decode()
+    if compact:
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(payload, indent=2, ensure_ascii=False, separators=(',', ': '))
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class MigrationError:
     """Represents a migration error."""
     database: str
@@ -24,7 +113,7 @@ class MigrationError:
     raw_error: str
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class TableDependency:
     """Represents a table creation migration."""
     database: str
@@ -41,73 +130,154 @@ class MigrationHealer:
         self.errors: List[MigrationError] = []
         self.dependencies: Dict[str, List[TableDependency]] = defaultdict(list)
 
-    def parse_migration_output(self, output: str) -> List[MigrationError]:
-        """Parse Laravel migration error output."""
-        errors = []
-
-        # Strip ANSI escape codes that Laravel/Docker might include
-        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-        output = ansi_escape.sub('', output)
-
-        # Primary pattern: Match with ANY amount of whitespace (including newlines)
-        # between Table '...' and doesn't exist
-        primary_pattern = re.compile(
-            r"Table\s+'([^']+)\.([^']+?)'\s+doesn't\s+exist",
-            re.IGNORECASE | re.MULTILINE | re.DOTALL
-        )
+    def parse_migration_output(self, output: Union[str, Iterable[str]]) -> List[MigrationError]:
+        """
+        Parse Laravel migration error output.
 
-        for match in primary_pattern.finditer(output):
-            database, table = match.groups()
-            # Clean up any whitespace and newlines within the captured strings
-            database = re.sub(r'\s+', '', database)
-            table = re.sub(r'\s+', '', table)
-
-            # Try to determine operation type from context
-            operation = 'UNKNOWN'
-            context_start = max(0, match.start() - 200)
-            context = output[context_start:match.end() + 100]
-
-            if re.search(r'alter\s+table', context, re.IGNORECASE):
-                operation = 'ALTER'
-            elif re.search(r'create\s+table', context, re.IGNORECASE):
-                operation = 'CREATE'
-            elif re.search(r'drop\s+table', context, re.IGNORECASE):
-                operation = 'DROP'
-
-            errors.append(MigrationError(
-                database=database,
-                table=table,
-                operation=operation,
-                error_type='MISSING_TABLE',
-                raw_error=match.group(0)
-            ))
-
-        # Alternative pattern: SQLSTATE format
-        sqlstate_pattern = re.compile(
-            r"SQLSTATE\[42S02\].*?Table\s+'?([^'\s\.]+)\.([^'\s]+)'?\s+doesn't\s+exist",
-            re.IGNORECASE | re.DOTALL
-        )
+        Accepts the whole output as a string or as an iterable of text chunks.
+        Chunks are scanned through a sliding window, so memory stays bounded
+        by the chunk size instead of the size of the log.
+        """
+        if isinstance(output, str):
+            output = (output,)
 
-        seen = {(e.database, e.table) for e in errors}
-        for match in sqlstate_pattern.finditer(output):
-            database, table = match.groups()
-            database = database.strip()
-            table = table.strip()
+        errors = []
+        fallback = []
+        seen = set()
+        window = ''
+        scan_from = 0
+        marker_from = 0
+        # Text from the start of a SQLSTATE marker already trimmed off the
+        # window, kept (up to _RAW_ERROR_LEN chars) for the error it accounts for
+        marker_text: Optional[str] = None
+
+        chunks = iter(output)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            next_chunk = next(chunks, None)
+            final = next_chunk is None
+
+            # Strip ANSI escape codes that Laravel/Docker might include.
+            # A sequence cut off at the chunk boundary is left as-is and
+            # removed once the rest of it arrives with the next chunk.
+            window = _strip_ansi(window + chunk)
+
+            # Error-free runs are the common case; skip the regex scan entirely.
+            # Only "doesn't" is checked since the pattern allows any whitespace
+            # (including newlines) before "exist".
+            if _DOESNT.search(window, scan_from):
+                matches = _MISSING_TABLE.finditer(window, scan_from)
+            else:
+                matches = ()
+
+            for match in matches:
+                if not final and match.end() + _CONTEXT_AFTER > len(window):
+                    # Wait for the next chunk to see the full context
+                    scan_from = match.start()
+                    break
+
+                # Each SQLSTATE marker accounts for the first table error after
+                # it that also reads as the fallback format; a primary-only
+                # match (e.g. a name wrapped over two lines) leaves it unused
+                if match.group(1) is None:
+                    fallback_match = match
+                else:
+                    fallback_match = _FALLBACK.match(window, match.start())
+                raw_error = None
+                if fallback_match is not None:
+                    if marker_text is not None:
+                        raw_error = (marker_text + window[:fallback_match.end()])[:_RAW_ERROR_LEN]
+                    else:
+                        marker = _SQLSTATE.search(window, marker_from, match.start())
+                        if marker is not None:
+                            raw_error = window[marker.start():fallback_match.end()][:_RAW_ERROR_LEN]
+                has_marker = raw_error is not None
+                if has_marker:
+                    marker_from = fallback_match.end()
+                    marker_text = None
+                scan_from = match.end()
+
+                if match.group(1) is None:
+                    # SQLSTATE format; resolved after all primary matches are known.
+                    # raw_error runs from the marker, as in the Laravel message
+                    if has_marker:
+                        fallback.append((match.group(3), match.group(4), raw_error))
+                    continue
+
+                database, table = match.group(1, 2)
+                # Clean up any whitespace and newlines within the captured strings
+                # (terminal line wrapping can split long names)
+                database = ''.join(database.split())
+                table = ''.join(table.split())
+
+                # Try to determine operation type from context
+                operation = 'UNKNOWN'
+                context_start = max(0, match.start() - _CONTEXT_BEFORE)
+                # Collapse whitespace runs so plain substring checks still match
+                # keywords split across spaces or newlines
+                context = ' '.join(window[context_start:match.end() + _CONTEXT_AFTER].lower().split())
+
+                if 'alter table' in context:
+                    operation = 'ALTER'
+                elif 'create table' in context:
+                    operation = 'CREATE'
+                elif 'drop table' in context:
+                    operation = 'DROP'
 
+                errors.append(MigrationError(
+                    database=database,
+                    table=table,
+                    operation=operation,
+                    error_type='MISSING_TABLE',
+                    raw_error=match.group(0)
+                ))
+                # Duplicates are kept here; _detect_corruption counts repeats
+                seen.add((database, table))
+            else:
+                # Nothing pending; only keep enough tail to complete an error
+                # message that starts near the end of this chunk
+                scan_from = max(scan_from, len(window) - _CARRY)
+
+            if final:
+                break
+
+            # Drop everything that is no longer needed as context, keeping the
+            # text of a SQLSTATE marker in the discarded part
+            cut = max(0, scan_from - _CONTEXT_BEFORE)
+            if marker_text is not None:
+                missing = _RAW_ERROR_LEN - len(marker_text)
+                if missing > 0:
+                    marker_text += window[:min(cut, missing)]
+            elif marker_from < cut:
+                marker = _SQLSTATE.search(window, marker_from, cut + len('SQLSTATE[42S02]') - 1)
+                if marker is not None:
+                    marker_text = window[marker.start():min(cut, marker.start() + _RAW_ERROR_LEN)]
+            window = window[cut:]
+            scan_from -= cut
+            marker_from = max(0, marker_from - cut)
+            chunk = next_chunk
+
+        for database, table, raw_error in fallback:
             if (database, table) not in seen:
                 errors.append(MigrationError(
                     database=database,
                     table=table,
                     operation='UNKNOWN',
                     error_type='MISSING_TABLE',
-                    raw_error=match.group(0)[:150]
+                    raw_error=raw_error
                 ))
                 seen.add((database, table))
 
         return errors
 
-    def analyze_dependencies(self, errors: List[MigrationError]) -> Dict[str, List[str]]:
-        """Analyze what tables are missing per database."""
+    @staticmethod
+    def analyze_dependencies(errors: List[MigrationError]) -> Dict[str, List[str]]:
+        """
+        Analyze what tables are missing per database.
+
+        Table lists are sorted and unique, so callers showing only the first
+        few can slice them instead of sorting again.
+        """
         deps = defaultdict(set)
         for error in errors:
             deps[error.database].add(error.table)
@@ -125,22 +295,21 @@ class MigrationHealer:
         is_corrupted = self._detect_corruption(errors, deps)
 
         report = []
-        report.append("\n" + "=" * 70)
+        report.append("\n" + _SEP_EQ)
         report.append("🔍 MIGRATION DEPENDENCY ANALYSIS")
-        report.append("=" * 70)
+        report.append(_SEP_EQ)
         report.append(f"\nFound {len(errors)} missing table error(s) across {len(deps)} database(s)\n")
 
         for database, tables in deps.items():
             report.append(f"\n📊 Database: {database}")
             report.append(f"   Missing {len(tables)} table(s):")
-            for table in tables:
-                report.append(f"   • {table}")
+            report.extend(f"   • {table}" for table in tables)
 
         # Add corruption warning if detected
         if is_corrupted:
-            report.append("\n" + "⚠️ " * 35)
+            report.append("\n" + _WARN_BAR)
             report.append("🔥 DATABASE CORRUPTION DETECTED")
-            report.append("⚠️ " * 35)
+            report.append(_WARN_BAR)
             report.append("\nThis database appears to be corrupted or incomplete.")
             report.append("Multiple core tables are missing, suggesting:")
             report.append("  • Incomplete import")
@@ -148,9 +317,9 @@ class MigrationHealer:
             report.append("  • Database corruption")
             report.append("\n💣 RECOMMENDED: Use 'nuke' command to clean up and reimport")
 
-        report.append("\n" + "-" * 70)
+        report.append("\n" + _SEP_DASH)
         report.append("💡 RECOMMENDED SOLUTIONS")
-        report.append("-" * 70)
+        report.append(_SEP_DASH)
 
         if is_corrupted:
             report.append("\n🔥 CORRUPTION DETECTED - Recommended action:")
@@ -189,22 +358,26 @@ class MigrationHealer:
             report.append("   → migrate fresh customers")
             report.append("   ⚠️  WARNING: Deletes all data in customer databases!")
 
-        report.append("\n" + "=" * 70)
+        report.append("\n" + _SEP_EQ)
         report.append("📝 TECHNICAL DETAILS")
-        report.append("=" * 70)
-
-        for i, error in enumerate(errors, 1):
-            report.append(f"\nError #{i}:")
-            report.append(f"  Database: {error.database}")
-            report.append(f"  Table: {error.table}")
-            report.append(f"  Operation: {error.operation}")
-            report.append(f"  Type: {error.error_type}")
+        report.append(_SEP_EQ)
+
+        # One formatted block per error rather than five appends each
+        report.extend(
+            f"\nError #{i}:\n"
+            f"  Database: {error.database}\n"
+            f"  Table: {error.table}\n"
+            f"  Operation: {error.operation}\n"
+            f"  Type: {error.error_type}"
+            for i, error in enumerate(errors, 1)
+        )
 
-        report.append("\n" + "=" * 70 + "\n")
+        report.append("\n" + _SEP_EQ + "\n")
 
         return "\n".join(report)
 
-    def _detect_corruption(self, errors: List[MigrationError], deps: Dict[str, List[str]]) -> bool:
+    @staticmethod
+    def _detect_corruption(errors: List[MigrationError], deps: Dict[str, List[str]]) -> bool:
         """
         Detect if the database appears corrupted vs just having missing migrations.
 
@@ -213,60 +386,109 @@ class MigrationHealer:
         - Missing tables that start with numbers (like 06_order) which are core tables
         - Multiple errors for the same missing table (migration retry failures)
         """
+        # A single failure can satisfy neither check below
+        if len(errors) < 2:
+            return False
+
         # Multiple missing tables in one database suggests corruption
+        unique_tables = 0
         for database, tables in deps.items():
             if len(tables) >= 3:  # 3+ missing tables = likely corrupted
                 return True
+            unique_tables += len(tables)
+
+        # deps holds each (database, table) once, so matching counts mean
+        # no table failed twice and the counting pass can be skipped
+        if len(errors) == unique_tables:
+            return False
+
+        # Same table failing repeatedly (seen in error duplicates); core
+        # tables (starting with digits) failing = corruption
+        error_counts = Counter((error.database, error.table) for error in errors)
+        return any(
+            count >= 2 and table[:1].isdigit()
+            for (database, table), count in error_counts.items()
+        )
 
-        # Multiple errors for same table (seen in error duplicates)
-        error_counts = {}
-        for error in errors:
-            key = (error.database, error.table)
-            error_counts[key] = error_counts.get(key, 0) + 1
-
-        # If same table error appears multiple times, it's failing repeatedly
-        if any(count >= 2 for count in error_counts.values()):
-            # Core tables (starting with digits) failing = corruption
-            for (db, table), count in error_counts.items():
-                if count >= 2 and table[0].isdigit():
-                    return True
+    def _docker_check_argv(self, database: str, tables: List[str]) -> List[str]:
+        """Build the docker exec argv that lists which of tables exist in database."""
+        def literal(value: str) -> str:
+            # MySQL string literal; backslashes escape by default
+            return "'" + value.replace('\\', '\\\\').replace("'", "''") + "'"
 
-        return False
+        names = ','.join(literal(table) for table in tables)
+        sql = (
+            "SELECT TABLE_NAME FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA={literal(database)} AND TABLE_NAME IN ({names});"
+        )
+        return [
+            'docker', 'exec', '-i', self.container_name,
+            'mysql', '-u', 'root', '-h', 'mysql-service', database,
+            '-N', '-e', sql,
+        ]
 
     def generate_docker_check_commands(self, deps: Dict[str, List[str]]) -> List[str]:
-        """Generate Docker commands to check table existence."""
-        commands = []
+        """
+        Generate Docker commands to check table existence.
 
-        for database, tables in deps.items():
-            for table in tables:
-                cmd = (
-                    f"docker exec -i {self.container_name} "
-                    f"mysql -u root -h mysql-service {database} "
-                    f"-N -e \"SHOW TABLES LIKE '{table}';\""
+        Emits one command per database that looks up all of its missing tables
+        at once, so each database costs a single mysql client start. Commands
+        are shell-quoted, so they can be pasted or run through a shell as-is.
+        """
+        return [
+            shlex.join(self._docker_check_argv(database, tables))
+            for database, tables in deps.items()
+        ]
+
+    def run_docker_checks(self, deps: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Run the table existence checks and return the tables found per database.
+
+        Each check is a separate docker exec that mostly waits on process
+        startup and MySQL, so they run concurrently on a thread pool.
+        Databases whose check failed or timed out are left out of the result.
+        """
+        databases = list(deps)
+        commands = [self._docker_check_argv(database, tables) for database, tables in deps.items()]
+
+        def run(argv: List[str]) -> Optional[subprocess.CompletedProcess]:
+            # stdin is closed so concurrent docker exec -i calls never read
+            # from the user's terminal
+            try:
+                return subprocess.run(
+                    argv,
+                    stdin=subprocess.DEVNULL,
+                    capture_output=True,
+                    text=True,
+                    timeout=_CHECK_TIMEOUT,
                 )
-                commands.append(cmd)
+            except (OSError, subprocess.TimeoutExpired):
+                return None
 
-        return commands
+        with ThreadPoolExecutor(max_workers=_CHECK_WORKERS) as executor:
+            results = list(executor.map(run, commands))
 
-    def generate_heal_suggestions(self, deps: Dict[str, List[str]]) -> Dict[str, any]:
-        """Generate structured healing suggestions."""
-        suggestions = {
-            "databases_affected": list(deps.keys()),
-            "total_missing_tables": sum(len(tables) for tables in deps.values()),
-            "actions": []
+        return {
+            database: result.stdout.split()
+            for database, result in zip(databases, results)
+            if result is not None and result.returncode == 0
         }
 
+    def generate_heal_suggestions(self, deps: Dict[str, List[str]]) -> Dict[str, any]:
+        """Generate structured healing suggestions."""
         # Suggest checking migration status
-        for database in deps.keys():
-            suggestions["actions"].append({
+        actions = [
+            {
                 "priority": 1,
                 "type": "check_status",
                 "command": f"migrate check {database}",
                 "description": f"Check migration status for {database}"
-            })
+            }
+            for database in deps
+        ]
 
         # Suggest running heal
-        suggestions["actions"].append({
+        actions.append({
             "priority": 2,
             "type": "heal",
             "command": "migrate heal",
@@ -274,44 +496,53 @@ class MigrationHealer:
         })
 
         # Suggest manual verification
-        for database, tables in deps.items():
-            for table in tables[:5]:  # Limit to 5 per database
-                suggestions["actions"].append({
-                    "priority": 3,
-                    "type": "verify",
-                    "command": f"check table {database}.{table}",
-                    "description": f"Verify if {table} actually exists in {database}"
-                })
+        actions.extend(
+            {
+                "priority": 3,
+                "type": "verify",
+                "command": f"check table {database}.{table}",
+                "description": f"Verify if {table} actually exists in {database}"
+            }
+            for database, tables in deps.items()
+            for table in islice(tables, 5)  # Limit to 5 per database
+        )
+
+        suggestions = {
+            "databases_affected": list(deps.keys()),
+            "total_missing_tables": sum(len(tables) for tables in deps.values()),
+            "actions": actions
+        }
 
         return suggestions
 
 
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: migration-healer.py <container_name> [migration_output_file]", file=sys.stderr)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: migration-healer.py <container_name> [migration_output_file] [--json [--compact]]", file=sys.stderr)
         sys.exit(1)
 
-    container_name = sys.argv[1]
-
-    # Read migration output from stdin or file
-    if len(sys.argv) > 2:
-        with open(sys.argv[2], 'r') as f:
-            migration_output = f.read()
-    else:
-        migration_output = sys.stdin.read()
+    container_name = args[0]
 
-    # Check for --json flag
+    # Check for --json / --compact flags
     json_output = '--json' in sys.argv
+    compact = '--compact' in sys.argv
 
     healer = MigrationHealer(container_name)
-    errors = healer.parse_migration_output(migration_output)
+
+    # Stream migration output from stdin or file
+    if len(args) > 1:
+        with open(args[1], 'r') as f:
+            errors = healer.parse_migration_output(_read_chunks(f))
+    else:
+        errors = healer.parse_migration_output(_read_chunks(sys.stdin))
 
     if json_output:
         # JSON output for programmatic use
         deps = healer.analyze_dependencies(errors)
         suggestions = healer.generate_heal_suggestions(deps)
-        print(json.dumps({
+        print(_dump_json({
             "error_count": len(errors),
             "errors": [
                 {
@@ -324,7 +555,7 @@ def main():
             ],
             "dependencies": deps,
             "suggestions": suggestions
-        }, indent=2))
+        }, compact))
     else:
         # Human-readable report
         report = healer.generate_report(errors)
@@ -0,0 +1,74 @@
+"""
+Consistency checks for lib/migration-healer.py.
+
+parse_migration_output scans its input through a sliding window, so parsing
+a log in chunks must give exactly the same errors as parsing it whole.
+
+Run with: python3 -m unittest discover tests
+"""
+
+import importlib.util
+import random
+import unittest
+from pathlib import Path
+
+_SCRIPT = Path(__file__).resolve().parent.parent / 'lib' / 'migration-healer.py'
+_spec = importlib.util.spec_from_file_location('migration_healer', _SCRIPT)
+healer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(healer)
+
+# Log fragments covering both error formats, SQLSTATE markers far from their
+# error, wrapped names, operation keywords and colour codes
+_PIECES = [
+    "Migrating: 2020_01_01_000000_create_orders_table\n",
+    "\x1b[31mERROR\x1b[0m ",
+    "\x1b[2K\x1b[1G",
+    "ALTER TABLE foo ",
+    "create table bar ",
+    "drop table baz; ",
+    "SQLSTATE[42S02]: Base table or view not found: 1146 Table 'db1.06_order' doesn't exist\n",
+    "SQLSTATE[42S02]: Base table or view not found: 1146 Table db3.t3 doesn't exist (SQL: alter table x)\n",
+    "SQLSTATE[42S02]: Base table not found: 1146 Table 'dbw.very\nlong' doesn't exist\n",
+    "SQLSTATE[42S02] ",
+    "Table 'db2.ta\nble'  doesn't\n exist\n",
+    "Table 'db1.06_order' DOESN'T EXIST\n",
+    "Table db4.t4 doesn't exist\n",
+    "x" * 300 + "\n",
+]
+
+
+def _parse(output):
+    return healer.MigrationHealer('test').parse_migration_output(output)
+
+
+def _chunks(text, size):
+    return iter([text[i:i + size] for i in range(0, len(text), size)])
+
+
+class StreamingParseTest(unittest.TestCase):
+
+    def test_chunked_parse_matches_whole_parse(self):
+        rng = random.Random(1146)
+        for _ in range(200):
+            text = ''.join(rng.choice(_PIECES) for _ in range(rng.randint(0, 60)))
+            expected = _parse(text)
+            for size in (1, 64, 500):
+                with self.subTest(text=text[:80], size=size):
+                    self.assertEqual(_parse(_chunks(text, size)), expected)
+
+    def test_wrapped_name_leaves_marker_for_next_error(self):
+        text = (
+            "SQLSTATE[42S02]: ... 1146 Table 'db.very\nlong' doesn't exist\n"
+            "Table db2.t2 doesn't exist"
+        )
+        for output in (text, _chunks(text, 1)):
+            errors = _parse(output)
+            self.assertEqual(
+                [(e.database, e.table) for e in errors],
+                [('db', 'verylong'), ('db2', 't2')]
+            )
+            self.assertTrue(errors[1].raw_error.startswith('SQLSTATE[42S02]'))
+
+
+if __name__ == '__main__':
+    unittest.main()